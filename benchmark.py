@@ -0,0 +1,124 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from predictor import ScheduleSet, ScheduleSnapshot, WorkingDayCroniter, _node_cache
+
+LEAVES = [
+    "0 8 * * 1-5",
+    "0 9 * * 1",
+    "0 9 * * 3",
+    "30 18 1,15 * *",
+    "0 0 1W * *",
+    "0 0 3W * *",
+    "0 0 LW * *",
+    "0 12 * 3 *",
+]
+
+# AND combinations must agree on minute and hour, otherwise they never intersect.
+AND_GROUPS = [
+    ["0 9 15W * *", "0 9 * * 3"],
+    ["0 12 * 3 *", "0 12 10W * *"],
+    ["0 9 5 * *", "0 9 * * 1"],
+    ["0 0 1W * *", "0 0 * * 1-5"],
+]
+
+HOLIDAYS = [datetime(2024, 1, 1), datetime(2024, 7, 4), datetime(2024, 12, 25)]
+
+
+def random_expression(rng: random.Random):
+    kind = rng.random()
+    if kind < 0.5:
+        return rng.choice(LEAVES)
+    if kind < 0.8:
+        return rng.choice(AND_GROUPS)
+    return ("OR", rng.choice(LEAVES), rng.choice(AND_GROUPS))
+
+
+def measure_memory(count: int):
+    """
+    Reports the resident cost of registering ``count`` schedules.
+
+    :param count: Number of schedules to build.
+    """
+    rng = random.Random(42)
+    expressions = [random_expression(rng) for _ in range(count)]
+    base = datetime(2024, 1, 1)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    schedules = [WorkingDayCroniter(expr, base, holidays=list(HOLIDAYS)) for expr in expressions]
+    elapsed = time.perf_counter() - start
+    idle, _ = tracemalloc.get_traced_memory()
+
+    for schedule in schedules[:1000]:
+        schedule.get_next(datetime)
+    active, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"schedules:               {count}")
+    print(f"distinct compiled nodes: {len(_node_cache)}")
+    print(f"build time:              {elapsed:.3f}s")
+    print(f"bytes per idle schedule: {(idle - before) / count:.1f}")
+    print(f"bytes per used schedule: {(active - idle) / 1000:.1f} (extra, first 1000 after one get_next)")
+
+
+def measure_snapshot_load(count: int):
+    """
+    Reports how long a fresh process needs to answer a query from a snapshot of ``count`` schedules.
+
+    :param count: Number of schedules to store.
+    """
+    rng = random.Random(42)
+    expressions = [random_expression(rng) for _ in range(count)]
+    path = os.path.join(tempfile.mkdtemp(), "schedules.bin")
+
+    start = time.perf_counter()
+    ScheduleSnapshot.dump(path, expressions, HOLIDAYS)
+    dumped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ScheduleSnapshot.load(path) as snapshot:
+        snapshot.iterator(count // 2, datetime(2024, 1, 1)).get_next(datetime)
+        first_answer = time.perf_counter() - start
+
+    print(f"snapshot size:           {os.path.getsize(path)} bytes")
+    print(f"snapshot dump time:      {dumped:.3f}s")
+    print(f"load to first get_next:  {first_answer * 1000:.2f}ms")
+
+
+def measure_bulk_query(count: int):
+    """
+    Compares ``ScheduleSet.get_next`` with one ``WorkingDayCroniter`` per schedule.
+
+    :param count: Number of schedules to query.
+    """
+    rng = random.Random(42)
+    expressions = [random_expression(rng) for _ in range(count)]
+    reference = datetime(2024, 3, 15, 10, 30)
+
+    start = time.perf_counter()
+    schedule_set = ScheduleSet(expressions, HOLIDAYS)
+    bulk = schedule_set.get_next(reference)
+    bulk_elapsed = time.perf_counter() - start
+
+    sample = expressions[:1000]
+    start = time.perf_counter()
+    for expr in sample:
+        WorkingDayCroniter(expr, reference, HOLIDAYS, schedule_set.calendar).get_next(datetime)
+    loop_elapsed = (time.perf_counter() - start) * count / len(sample)
+
+    print(f"bulk next for {len(bulk)}:     {bulk_elapsed:.3f}s")
+    print(f"per-schedule loop:       {loop_elapsed:.3f}s (extrapolated from {len(sample)})")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    measure_memory(count)
+    measure_snapshot_load(count)
+    measure_bulk_query(count)
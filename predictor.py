@@ -1,11 +1,23 @@
 from datetime import datetime, timedelta
 import calendar
 from typing import List, Dict, Optional, Any, Union, Tuple
-from collections import Counter
-from croniter import croniter
+from collections import Counter, deque
+from croniter import croniter, CroniterBadDateError
 from functools import lru_cache
 from copy import deepcopy
 import threading
+import weakref
+import bisect
+import mmap
+import os
+import struct
+import sys
+import argparse
+import contextlib
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
 
 import threading
 from datetime import datetime, timedelta
@@ -13,81 +25,107 @@ from typing import List, Optional, Union, Tuple
 from copy import deepcopy
 from croniter import croniter
 
-class WorkingDayCroniter:
-    def __init__(
-        self,
-        expr: Union[str, List, Tuple],
-        base: datetime,
-        holidays: Optional[List[datetime]] = None
-    ):
-        self.base = base
-        self.holidays = set(holidays or [])
-        self._state = threading.local()
-        self._state.last_date = None
+_node_cache = weakref.WeakValueDictionary()
+_holiday_cache = weakref.WeakValueDictionary()
 
-        self.expr = expr if isinstance(expr, str) else None
 
-        if isinstance(expr, (list, tuple)):
-            self.operator = expr[0].upper() if isinstance(expr, tuple) else "AND"
-            self.children = [
-                WorkingDayCroniter(e, base, holidays) 
-                for e in (expr[1:] if isinstance(expr, tuple) else expr)
-            ]
-            self._is_logical_node = True
-        else:
-            self.operator = None
-            self._is_logical_node = False
-            self._parse_single_expression(expr)
-
-    def _parse_single_expression(self, expr: str):
-        """Processes single cron expressions (with or without 'W'/'LW')."""
-        self._raise_if_invalid_expr(expr)
-        self._has_working_day = "W" in expr
-        if self._has_working_day:
-            self._cron_iter = None
-        else:
-            self._cron_iter = croniter(expr, self.base)
+class CronNode:
+    """
+    Immutable, compiled form of a cron expression or of an AND/OR expression tree.
 
-    def _handle_single_expression(self, date_class):
-        if not self._has_working_day:
-            return self._cron_iter.get_next(date_class)
+    Nodes are hash-consed: compiling a structurally identical expression returns the
+    same instance, so every schedule that uses e.g. ``0 8 * * 1-5`` shares one leaf.
+    Nodes hold no iteration state; that lives in ``WorkingDayCroniter``.
+    """
+    __slots__ = ("expr", "operator", "children", "base_expr", "working_days", "normal_days", "__weakref__")
 
-        cron_expr = self._get_base_cron_expr()
-        working_days = self._parse_working_days(self.expr.split()[2])
-        normal_days = self._parse_normal_days(self.expr.split()[2])
-        iter_base = croniter(cron_expr, self._state.last_date or self.base)
+    @classmethod
+    def compile(cls, expr: Union[str, List, Tuple, "CronNode"]) -> "CronNode":
+        """
+        Compiles an expression into its shared node.
 
-        max_iterations = 1500
-        for _ in range(max_iterations):
-            candidate_date = iter_base.get_next(date_class)
-            if self._matches_working_day(candidate_date, working_days) or \
-               self._matches_normal_day(candidate_date, normal_days):
-                self._state.last_date = candidate_date
-                return candidate_date
-        raise RuntimeError("Exceeded maximum iterations while finding the next valid date.")
+        :param expr: A cron string, a list of expressions (AND) or a tuple whose first item is the operator.
+        :return: The interned node for the expression.
+        """
+        if isinstance(expr, CronNode):
+            return expr
 
-    def _handle_single_expression_prev(self, date_class):
-        if not self._has_working_day:
-            return self._cron_iter.get_prev(date_class)
+        if isinstance(expr, (list, tuple)):
+            operator = expr[0].upper() if isinstance(expr, tuple) else "AND"
+            children = tuple(cls.compile(e) for e in (expr[1:] if isinstance(expr, tuple) else expr))
+            key = (operator, children)
+        else:
+            key = " ".join(expr.split())
+
+        node = _node_cache.get(key)
+        if node is None:
+            node = cls.__new__(cls)
+            if isinstance(key, tuple):
+                node._init_logical(*key)
+            else:
+                node._init_single(key)
+            node = _node_cache.setdefault(key, node)
+        return node
+
+    @classmethod
+    def _compile_trusted(cls, expr: str) -> "CronNode":
+        """
+        Interns a normalized single expression without validating it again.
 
-        cron_expr = self._get_base_cron_expr()
-        working_days = self._parse_working_days(self.expr.split()[2])
-        normal_days = self._parse_normal_days(self.expr.split()[2])
+        Only for expressions that came out of a ``CronNode``, e.g. read back from a snapshot.
+        """
+        node = _node_cache.get(expr)
+        if node is None:
+            node = cls.__new__(cls)
+            node._init_single(expr, validate=False)
+            node = _node_cache.setdefault(expr, node)
+        return node
+
+    def _init_logical(self, operator: str, children: Tuple["CronNode", ...]):
+        self.expr = None
+        self.operator = operator
+        self.children = children
+        self.base_expr = None
+        self.working_days = ()
+        self.normal_days = ()
+
+    def _init_single(self, expr: str, validate: bool = True):
+        """Validates a single cron expression (with or without 'W'/'LW') and pre-parses its day field."""
+        if validate:
+            self._raise_if_invalid_expr(expr)
+        self.expr = expr
+        self.operator = None
+        self.children = ()
+        if "W" in expr:
+            parts = expr.split()
+            self.working_days = self._parse_working_days(parts[2])
+            self.normal_days = self._parse_normal_days(parts[2])
+            parts[2] = "*"
+            self.base_expr = " ".join(parts)
+        else:
+            self.base_expr = None
+            self.working_days = ()
+            self.normal_days = ()
 
-        start_date = self._state.last_date if self._state.last_date else self.base
-        iter_base = croniter(cron_expr, start_date)
+    @property
+    def has_working_day(self) -> bool:
+        return self.base_expr is not None
 
-        max_iterations = 1500
-        for _ in range(max_iterations):
-            candidate_date = iter_base.get_prev(date_class)
-            if self._matches_working_day(candidate_date, working_days) or \
-               self._matches_normal_day(candidate_date, normal_days):
-                self._state.last_date = candidate_date
-                return candidate_date
-        raise RuntimeError("Exceeded maximum iterations while finding the previous valid date.")
+    def to_expr(self) -> Union[str, Tuple]:
+        """Returns the expression this node was compiled from, in the form accepted by ``compile``."""
+        if self.operator is None:
+            return self.expr
+        return (self.operator, *(child.to_expr() for child in self.children))
+
+    def __reduce__(self):
+        return (CronNode.compile, (self.to_expr(),))
+
+    def __repr__(self) -> str:
+        return f"CronNode({self.to_expr()!r})"
 
-    def _raise_if_invalid_expr(self, expr: str):
-        expr_parts = deepcopy(expr).split()
+    @staticmethod
+    def _raise_if_invalid_expr(expr: str):
+        expr_parts = expr.split()
         if len(expr_parts) != 5:
             raise ValueError("Cron expression must have exactly 5 parts.")
 
@@ -109,14 +147,211 @@ class WorkingDayCroniter:
         if not croniter.is_valid(expr_to_validate):
             raise ValueError(f"Invalid cron expression: {expr}")
 
+    @staticmethod
+    def _parse_working_days(day_of_month: str) -> Tuple[Union[int, str], ...]:
+        working_days = []
+        for part in day_of_month.split(','):
+            if 'W' in part:
+                if part == 'LW':
+                    working_days.append('LW')
+                else:
+                    num_part = part.replace('W', '')
+                    try:
+                        working_days.append(int(num_part))
+                    except ValueError:
+                        pass  # Handled in validation
+        return tuple(working_days)
+
+    @staticmethod
+    def _parse_normal_days(day_of_month: str) -> Tuple[int, ...]:
+        return tuple(int(part) for part in day_of_month.split(',') if part.isdigit())
+
+
+class WorkingDayCalendar:
+    """
+    Precomputed per-month working-day index for a holiday calendar.
+
+    Each month is a 32-byte row: byte 0 holds the number of working days in the month
+    and byte ``d`` the ordinal of day ``d`` among them (0 for weekends and holidays).
+    Like ``WorkingDayCroniter``, holidays are matched by calendar day. The table can live
+    in any buffer, which lets a snapshot in shared memory serve every worker process from
+    one copy.
+    """
+    __slots__ = ("holidays", "first_month", "_table")
+
+    def __init__(self, holidays, first_month: int, table):
+        """
+        :param holidays: The holiday calendar the table was built from.
+        :param first_month: ``year * 12 + month - 1`` of the first row.
+        :param table: Buffer with 32 bytes per month.
+        """
+        self.holidays = WorkingDayCroniter._intern_holidays(holidays)
+        self.first_month = first_month
+        self._table = memoryview(table).cast("B")
+
+    @classmethod
+    def build(cls, holidays: Optional[List[datetime]], first_year: int, last_year: int) -> "WorkingDayCalendar":
+        """
+        Computes the table for every month from January of ``first_year`` to December of ``last_year``.
+        """
+        holidays = WorkingDayCroniter._intern_holidays(holidays)
+        days_off = {(dt.year, dt.month, dt.day) for dt in holidays}
+        table = bytearray((last_year - first_year + 1) * 12 * 32)
+        row = 0
+        for year in range(first_year, last_year + 1):
+            for month in range(1, 13):
+                count = 0
+                first_weekday, last_day = calendar.monthrange(year, month)
+                for day in range(1, last_day + 1):
+                    if (first_weekday + day - 1) % 7 < 5 and (year, month, day) not in days_off:
+                        count += 1
+                        table[row + day] = count
+                table[row] = count
+                row += 32
+        return cls(holidays, first_year * 12, table)
+
+    @property
+    def table(self) -> memoryview:
+        return self._table
+
+    def _row(self, year: int, month: int) -> Optional[int]:
+        index = year * 12 + month - 1 - self.first_month
+        if index < 0 or index * 32 >= len(self._table):
+            return None
+        return index * 32
+
+    def covers(self, year: int, month: int) -> bool:
+        return self._row(year, month) is not None
+
+    def nth_working_day(self, date: datetime) -> Optional[int]:
+        """
+        :return: The ordinal of ``date`` among its month's working days, 0 if it is not a
+                 working day, or None if the month is outside the table.
+        """
+        row = self._row(date.year, date.month)
+        return None if row is None else self._table[row + date.day]
+
+    def working_day_count(self, year: int, month: int) -> Optional[int]:
+        row = self._row(year, month)
+        return None if row is None else self._table[row]
+
+    def working_days(self, year: int, month: int) -> Optional[List[datetime]]:
+        row = self._row(year, month)
+        if row is None:
+            return None
+        return [datetime(year, month, day) for day in range(1, 32) if self._table[row + day]]
+
+
+class WorkingDayCroniter:
+    """
+    Iterates over the dates of a compiled ``CronNode`` tree.
+
+    The tree itself is shared between every iterator built from the same expression;
+    each iterator only keeps its own position. Child iterators and the underlying
+    ``croniter`` are created on first use, so idle schedules stay small.
+
+    Holidays are matched by calendar day, whatever time the schedule fires at.
+    When a ``WorkingDayCalendar`` is given, working-day ordinals for the months it covers
+    are read from its table instead of being recounted for every candidate date.
+    """
+    __slots__ = ("node", "base", "holidays", "calendar", "_children", "_cron_iter", "_last_date")
+
+    def __init__(
+        self,
+        expr: Union[str, List, Tuple, CronNode],
+        base: datetime,
+        holidays: Optional[List[datetime]] = None,
+        calendar: Optional[WorkingDayCalendar] = None
+    ):
+        self.node = CronNode.compile(expr)
+        self.base = base
+        if calendar is None:
+            self.holidays = self._intern_holidays(holidays)
+        elif holidays is None or self._intern_holidays(holidays) is calendar.holidays:
+            self.holidays = calendar.holidays
+        else:
+            raise ValueError("Holidays do not match the working day calendar.")
+        self.calendar = calendar
+        self._children = None
+        self._cron_iter = None
+        self._last_date = None
+
+    @staticmethod
+    def _intern_holidays(holidays) -> frozenset:
+        """Returns one shared frozenset per distinct holiday calendar, with every holiday at midnight."""
+        holidays = frozenset(datetime(dt.year, dt.month, dt.day) for dt in holidays or ())
+        return _holiday_cache.setdefault(holidays, holidays)
+
+    def _spawn(self, node: CronNode) -> "WorkingDayCroniter":
+        child = WorkingDayCroniter.__new__(WorkingDayCroniter)
+        child.node = node
+        child.base = self.base
+        child.holidays = self.holidays
+        child.calendar = self.calendar
+        child._children = None
+        child._cron_iter = None
+        child._last_date = None
+        return child
+
+    @property
+    def expr(self) -> Optional[str]:
+        return self.node.expr
+
+    @property
+    def operator(self) -> Optional[str]:
+        return self.node.operator
+
+    @property
+    def children(self) -> List["WorkingDayCroniter"]:
+        if self._children is None:
+            self._children = [self._spawn(child) for child in self.node.children]
+        return self._children
+
+    def _handle_single_expression(self, date_class):
+        node = self.node
+        if not node.has_working_day:
+            if self._cron_iter is None:
+                self._cron_iter = croniter(node.expr, self.base)
+            return self._cron_iter.get_next(date_class)
+
+        iter_base = croniter(node.base_expr, self._last_date or self.base)
+
+        max_iterations = 1500
+        for _ in range(max_iterations):
+            candidate_date = iter_base.get_next(date_class)
+            if self._matches_working_day(candidate_date, node.working_days) or \
+               self._matches_normal_day(candidate_date, node.normal_days):
+                self._last_date = candidate_date
+                return candidate_date
+        raise RuntimeError("Exceeded maximum iterations while finding the next valid date.")
+
+    def _handle_single_expression_prev(self, date_class):
+        node = self.node
+        if not node.has_working_day:
+            if self._cron_iter is None:
+                self._cron_iter = croniter(node.expr, self.base)
+            return self._cron_iter.get_prev(date_class)
+
+        start_date = self._last_date if self._last_date else self.base
+        iter_base = croniter(node.base_expr, start_date)
+
+        max_iterations = 1500
+        for _ in range(max_iterations):
+            candidate_date = iter_base.get_prev(date_class)
+            if self._matches_working_day(candidate_date, node.working_days) or \
+               self._matches_normal_day(candidate_date, node.normal_days):
+                self._last_date = candidate_date
+                return candidate_date
+        raise RuntimeError("Exceeded maximum iterations while finding the previous valid date.")
+
     def get_next(self, date_class=datetime) -> datetime:
-        if self._is_logical_node:
+        if self.node.operator is not None:
             return self._handle_logical_node(date_class)
         else:
             return self._handle_single_expression(date_class)
 
     def get_prev(self, date_class=datetime) -> datetime:
-        if self._is_logical_node:
+        if self.node.operator is not None:
             return self._handle_logical_node_prev(date_class)
         else:
             return self._handle_single_expression_prev(date_class)
@@ -175,7 +410,7 @@ class WorkingDayCroniter:
 
         while iterations < max_iterations:
             if all(d == candidate for d in current_dates):
-                self._state.last_date = candidate
+                self._last_date = candidate
                 return candidate
 
             for i in range(len(current_dates)):
@@ -187,34 +422,17 @@ class WorkingDayCroniter:
 
         raise RuntimeError("Exceeded maximum iterations for AND logic in get_prev.")
 
-    def _get_base_cron_expr(self) -> str:
-        parts = self.expr.split()
-        if "W" in parts[2] or "LW" in parts[2]:
-            parts[2] = "*"
-        return " ".join(parts)
-
-    def _parse_working_days(self, day_of_month: str) -> List[Union[int, str]]:
-        working_days = []
-        for part in day_of_month.split(','):
-            if 'W' in part:
-                if part == 'LW':
-                    working_days.append('LW')
-                else:
-                    num_part = part.replace('W', '')
-                    try:
-                        working_days.append(int(num_part))
-                    except ValueError:
-                        pass  # Handled in validation
-        return working_days
-
-    def _parse_normal_days(self, day_of_month: str) -> List[int]:
-        return [int(part) for part in day_of_month.split(',') if part.isdigit()]
-
     def _matches_working_day(self, date: datetime, working_days: List[Union[int, str]]) -> bool:
-        if not self._is_working_day(date):
+        nth = self.calendar.nth_working_day(date) if self.calendar is not None else None
+        if nth is None:
+            if not self._is_working_day(date):
+                return False
+            nth = self._get_nth_working_day(date)
+            is_last = self._is_last_working_day(date)
+        elif nth == 0:
             return False
-        nth = self._get_nth_working_day(date)
-        is_last = self._is_last_working_day(date)
+        else:
+            is_last = nth == self.calendar.working_day_count(date.year, date.month)
         for wd in working_days:
             if isinstance(wd, int) and nth == wd:
                 return True
@@ -226,7 +444,7 @@ class WorkingDayCroniter:
         return date.day in normal_days
 
     def _is_working_day(self, date: datetime) -> bool:
-        return date.weekday() < 5 and date not in self.holidays
+        return date.weekday() < 5 and datetime(date.year, date.month, date.day) not in self.holidays
 
     def _is_last_working_day(self, date: datetime) -> bool:
         if not self._is_working_day(date):
@@ -257,6 +475,650 @@ class WorkingDayCroniter:
                     return nth_working_day
         return 0
 
+_SNAPSHOT_MAGIC = b"WDCS"
+_SNAPSHOT_VERSION = 2
+_SNAPSHOT_HAS_TABLES = 0x1
+# magic, version, flags, nodes, edges, roots, holidays, occurrences, string bytes, table start, table end,
+# first calendar month, calendar months
+_SNAPSHOT_HEADER = struct.Struct("<4sHHIIIIQQqqiI")
+# kind, offset, length
+_SNAPSHOT_NODE = struct.Struct("<BxxxII")
+_SNAPSHOT_KINDS = {None: 0, "AND": 1, "OR": 2}
+_SNAPSHOT_OPERATORS = {kind: operator for operator, kind in _SNAPSHOT_KINDS.items()}
+_TICK = timedelta(microseconds=1)
+
+
+def _to_ticks(dt: datetime) -> int:
+    return (dt - datetime.min) // _TICK
+
+
+def _from_ticks(ticks: int) -> datetime:
+    return datetime.min + timedelta(microseconds=ticks)
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class ScheduleSnapshot:
+    """
+    Read-only, versioned binary image of compiled schedules, a holiday calendar and,
+    optionally, precomputed occurrence tables and a ``WorkingDayCalendar``.
+
+    The image is used in place (memory-mapped from a file or attached from shared memory):
+    schedules are decoded on first access and tables are served straight from the buffer,
+    so loading a snapshot costs the same whatever the size of the catalog, and processes
+    attached to the same shared memory block share a single copy of it.
+
+    Occurrence tables are only served through ``occurrences`` and ``next_occurrence``;
+    iterators built with ``iterator`` share the snapshot's schedules, holidays and
+    calendar but compute their dates themselves.
+
+    Layout (little-endian, every section 8-byte aligned)::
+
+        header | nodes | child indexes | roots | holidays | table offsets | occurrences | calendar | strings
+    """
+
+    def __init__(self, buffer):
+        """
+        Wraps a buffer holding a snapshot image.
+
+        :param buffer: Any object supporting the buffer protocol (bytes, mmap, shared memory).
+        """
+        self._mmap = None
+        self._shm = None
+        self._view = memoryview(buffer).cast("B")
+        try:
+            if len(self._view) < _SNAPSHOT_HEADER.size:
+                raise ValueError("Buffer does not contain a schedule snapshot.")
+            (magic, version, flags, n_nodes, n_edges, n_roots, n_holidays, n_occurrences, n_string_bytes,
+             table_start, table_end, first_month, n_months) = _SNAPSHOT_HEADER.unpack_from(self._view)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError("Buffer does not contain a schedule snapshot.")
+            if version != _SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported schedule snapshot version: {version}")
+
+            size = (
+                _padded(_SNAPSHOT_HEADER.size) + _padded(n_nodes * _SNAPSHOT_NODE.size) + _padded(n_edges * 4)
+                + _padded(n_roots * 4) + n_holidays * 8 + ((n_roots + 1) * 8 if flags & _SNAPSHOT_HAS_TABLES else 0)
+                + n_occurrences * 8 + n_months * 32 + n_string_bytes
+            )
+            if len(self._view) < size:
+                raise ValueError(f"Truncated schedule snapshot: expected {size} bytes, got {len(self._view)}.")
+        except ValueError:
+            self._view.release()
+            raise
+
+        offset = _padded(_SNAPSHOT_HEADER.size)
+        self._nodes_offset = offset
+        offset += _padded(n_nodes * _SNAPSHOT_NODE.size)
+        self._edges = self._view[offset:offset + n_edges * 4].cast("I")
+        offset += _padded(n_edges * 4)
+        self._roots = self._view[offset:offset + n_roots * 4].cast("I")
+        offset += _padded(n_roots * 4)
+        self._holiday_ticks = self._view[offset:offset + n_holidays * 8].cast("q")
+        offset += n_holidays * 8
+        if flags & _SNAPSHOT_HAS_TABLES:
+            self._table_offsets = self._view[offset:offset + (n_roots + 1) * 8].cast("q")
+            offset += (n_roots + 1) * 8
+            self.table_range = (_from_ticks(table_start), _from_ticks(table_end))
+        else:
+            self._table_offsets = None
+            self.table_range = None
+        self._occurrences = self._view[offset:offset + n_occurrences * 8].cast("q")
+        offset += n_occurrences * 8
+        self._calendar_table = self._view[offset:offset + n_months * 32]
+        self._first_month = first_month
+        offset += n_months * 32
+        self._strings_offset = offset
+
+        self._decoded = [None] * n_nodes
+        self._holidays = None
+        self._calendar = None
+
+    @classmethod
+    def load(cls, path: str) -> "ScheduleSnapshot":
+        """
+        Memory-maps a snapshot file.
+
+        :param path: Path written by ``dump``.
+        :return: The snapshot; call ``close`` (or use it as a context manager) to unmap it.
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snapshot = cls(mapped)
+        except Exception:
+            mapped.close()
+            raise
+        snapshot._mmap = mapped
+        return snapshot
+
+    @classmethod
+    def publish(
+        cls,
+        name: Optional[str],
+        schedules: List[Union[str, List, Tuple, CronNode]],
+        holidays: Optional[List[datetime]] = None,
+        occurrence_range: Optional[Tuple[datetime, datetime]] = None,
+        calendar_years: Optional[Tuple[int, int]] = None
+    ) -> "ScheduleSnapshot":
+        """
+        Builds a snapshot into a new shared memory block that other processes can ``attach`` to.
+
+        The publishing process owns the block and must ``unlink`` it once no worker needs it.
+
+        :param name: Name of the shared memory block, or None to let the system choose one.
+        :return: The snapshot; its block name is available as ``name``.
+        """
+        data = cls.to_bytes(schedules, holidays, occurrence_range, calendar_years)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls._from_shared_memory(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "ScheduleSnapshot":
+        """
+        Attaches to a snapshot published by another process, without copying it.
+
+        :param name: Name of the shared memory block given by ``publish``.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with this process's resource
+            # tracker, which would unlink it when the worker exits; only the publisher owns it
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls._from_shared_memory(shm)
+
+    @classmethod
+    def _from_shared_memory(cls, shm: shared_memory.SharedMemory) -> "ScheduleSnapshot":
+        try:
+            snapshot = cls(shm.buf)
+        except Exception:
+            shm.close()
+            raise
+        snapshot._shm = shm
+        return snapshot
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._shm.name if self._shm is not None else None
+
+    def unlink(self):
+        """Destroys the shared memory block; attached snapshots keep working until they are closed."""
+        if self._shm is not None:
+            # An attach in a forked worker shares our tracker and may have dropped our
+            # registration; registering again keeps the tracker's bookkeeping balanced
+            resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+
+    @classmethod
+    def dump(
+        cls,
+        path: str,
+        schedules: List[Union[str, List, Tuple, CronNode]],
+        holidays: Optional[List[datetime]] = None,
+        occurrence_range: Optional[Tuple[datetime, datetime]] = None,
+        calendar_years: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Writes a snapshot file, replacing any existing one atomically.
+
+        :param path: Destination file.
+        :param schedules: Expressions or compiled nodes; their position is the schedule index.
+        :param holidays: Holiday calendar shared by every schedule.
+        :param occurrence_range: Optional ``(start, end)`` window to precompute occurrences for.
+        :param calendar_years: Optional ``(first_year, last_year)`` to include a ``WorkingDayCalendar`` for.
+        """
+        data = cls.to_bytes(schedules, holidays, occurrence_range, calendar_years)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def to_bytes(
+        schedules: List[Union[str, List, Tuple, CronNode]],
+        holidays: Optional[List[datetime]] = None,
+        occurrence_range: Optional[Tuple[datetime, datetime]] = None,
+        calendar_years: Optional[Tuple[int, int]] = None
+    ) -> bytes:
+        """
+        Encodes schedules, holidays and the optional tables into a snapshot image.
+
+        :return: The image, suitable for ``ScheduleSnapshot(buffer)``.
+        """
+        roots = [CronNode.compile(expr) for expr in schedules]
+        holidays = WorkingDayCroniter._intern_holidays(holidays)
+        if calendar_years is not None:
+            working_days = WorkingDayCalendar.build(holidays, *calendar_years)
+        else:
+            working_days = None
+
+        index = {}
+        nodes = []
+        edges = []
+        strings = bytearray()
+
+        def encode(node: CronNode) -> int:
+            if id(node) in index:
+                return index[id(node)]
+            if node.operator not in _SNAPSHOT_KINDS:
+                raise ValueError(f"Unsupported operator: {node.operator}")
+            if node.operator is None:
+                raw = node.expr.encode("utf-8")
+                record = (0, len(strings), len(raw))
+                strings.extend(raw)
+            else:
+                children = [encode(child) for child in node.children]
+                record = (_SNAPSHOT_KINDS[node.operator], len(edges), len(children))
+                edges.extend(children)
+            index[id(node)] = len(nodes)
+            nodes.append(record)
+            return index[id(node)]
+
+        root_indexes = [encode(root) for root in roots]
+
+        flags = 0
+        table_start = table_end = 0
+        table_offsets = []
+        occurrences = []
+        if occurrence_range is not None:
+            flags |= _SNAPSHOT_HAS_TABLES
+            start, end = occurrence_range
+            table_start, table_end = _to_ticks(start), _to_ticks(end)
+            for root in roots:
+                table_offsets.append(len(occurrences))
+                cron = WorkingDayCroniter(root, start - timedelta(seconds=1), holidays, working_days)
+                try:
+                    next_date = cron.get_next(datetime)
+                    while next_date < end:
+                        occurrences.append(_to_ticks(next_date))
+                        next_date = cron.get_next(datetime)
+                except (CroniterBadDateError, RuntimeError):
+                    # Schedules with no matching date get an empty table rather than failing the dump
+                    del occurrences[table_offsets[-1]:]
+            table_offsets.append(len(occurrences))
+
+        out = bytearray(_SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, flags, len(nodes), len(edges), len(roots), len(holidays),
+            len(occurrences), len(strings), table_start, table_end,
+            working_days.first_month if working_days else 0, len(working_days.table) // 32 if working_days else 0,
+        ))
+
+        def align():
+            out.extend(bytes(_padded(len(out)) - len(out)))
+
+        align()
+        for record in nodes:
+            out.extend(_SNAPSHOT_NODE.pack(*record))
+        align()
+        out.extend(struct.pack(f"<{len(edges)}I", *edges))
+        align()
+        out.extend(struct.pack(f"<{len(root_indexes)}I", *root_indexes))
+        align()
+        out.extend(struct.pack(f"<{len(holidays)}q", *sorted(_to_ticks(dt) for dt in holidays)))
+        out.extend(struct.pack(f"<{len(table_offsets)}q", *table_offsets))
+        out.extend(struct.pack(f"<{len(occurrences)}q", *occurrences))
+        if working_days is not None:
+            out.extend(working_days.table)
+        out.extend(strings)
+        return bytes(out)
+
+    def __len__(self) -> int:
+        return len(self._roots)
+
+    def __enter__(self) -> "ScheduleSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Releases the views on the underlying buffer and unmaps or detaches it."""
+        if self._calendar is not None:
+            self._calendar.table.release()
+        for view in (self._edges, self._roots, self._holiday_ticks, self._table_offsets, self._occurrences,
+                     self._calendar_table, self._view):
+            if view is not None:
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._shm is not None:
+            self._shm.close()
+
+    @property
+    def holidays(self) -> frozenset:
+        if self._holidays is None:
+            self._holidays = WorkingDayCroniter._intern_holidays(_from_ticks(t) for t in self._holiday_ticks)
+        return self._holidays
+
+    @property
+    def calendar(self) -> Optional[WorkingDayCalendar]:
+        """The working-day table stored in the snapshot, viewed in place, or None."""
+        if self._calendar is None and len(self._calendar_table):
+            self._calendar = WorkingDayCalendar(self.holidays, self._first_month, self._calendar_table)
+        return self._calendar
+
+    def schedule(self, i: int) -> CronNode:
+        """
+        Returns the compiled schedule at position ``i``.
+
+        :param i: Schedule index, in the order given to ``dump``.
+        :return: The shared ``CronNode``.
+        """
+        return self._decode(self._roots[i])
+
+    def _decode(self, position: int) -> CronNode:
+        node = self._decoded[position]
+        if node is None:
+            kind, offset, length = _SNAPSHOT_NODE.unpack_from(
+                self._view, self._nodes_offset + position * _SNAPSHOT_NODE.size
+            )
+            if kind == 0:
+                start = self._strings_offset + offset
+                # Leaves were validated when the snapshot was written
+                node = CronNode._compile_trusted(bytes(self._view[start:start + length]).decode("utf-8"))
+            else:
+                children = [self._decode(child) for child in self._edges[offset:offset + length]]
+                node = CronNode.compile((_SNAPSHOT_OPERATORS[kind], *children))
+            self._decoded[position] = node
+        return node
+
+    def iterator(self, i: int, base: datetime) -> WorkingDayCroniter:
+        """
+        Builds a ``WorkingDayCroniter`` for schedule ``i`` using the snapshot's holidays and calendar.
+
+        The iterator does not read the occurrence tables; use ``next_occurrence`` for table lookups.
+        """
+        return WorkingDayCroniter(self.schedule(i), base, self.holidays, self.calendar)
+
+    def occurrences(self, i: int) -> List[datetime]:
+        """
+        Returns the precomputed occurrences of schedule ``i`` within ``table_range``.
+
+        :param i: Schedule index.
+        :return: Sorted list of datetimes (empty if the snapshot has no tables).
+        """
+        if self._table_offsets is None:
+            return []
+        return [_from_ticks(t) for t in self._occurrences[self._table_offsets[i]:self._table_offsets[i + 1]]]
+
+    def next_occurrence(self, i: int, after: datetime) -> Optional[datetime]:
+        """
+        Looks up the first occurrence of schedule ``i`` strictly after ``after`` in the tables.
+
+        :return: The occurrence, or None when the answer is not covered by ``table_range``
+                 (the caller should fall back to ``iterator``).
+        """
+        if self._table_offsets is None:
+            return None
+        start, end = self.table_range
+        if after < start:
+            return None
+        low, high = self._table_offsets[i], self._table_offsets[i + 1]
+        position = bisect.bisect_right(self._occurrences, _to_ticks(after), low, high)
+        if position == high:
+            return None
+        return _from_ticks(self._occurrences[position])
+
+
+class ScheduleSet:
+    """
+    Answers "next (or previous) fire time after T" for many schedules at once.
+
+    Schedules are reduced to their distinct compiled trees, and each tree to a union of
+    (day filter, times of day) alternatives. Day filters are evaluated as bitsets over a
+    window of days around the reference times, built by combining per-month, per-day,
+    per-weekday and per-working-day masks, so every schedule sharing the same
+    month/day/W fields shares one mask and finding the next fire day is a bit scan.
+
+    Trees that cannot be expressed this way (``L``, ``#``, ...) and answers outside the
+    window fall back to ``WorkingDayCroniter``; schedules it cannot answer either (e.g.
+    ``0 0 31 2 *``, or an AND of different times) get None instead of a fire time.
+    """
+    horizon_days = 366 * 4 + 1
+    max_alternatives = 64
+
+    def __init__(
+        self,
+        schedules: List[Union[str, List, Tuple, CronNode]],
+        holidays: Optional[List[datetime]] = None,
+        calendar: Optional[WorkingDayCalendar] = None
+    ):
+        """
+        :param schedules: Expressions or compiled nodes; results follow this order.
+        :param holidays: Holiday calendar shared by every schedule.
+        :param calendar: Optional precomputed working-day table. A query uses it as is when it covers
+                         whole years from ``horizon_days`` before the earliest reference to
+                         ``horizon_days`` after the latest one; otherwise a wider table is built
+                         from the same holidays, stored in ``self.calendar`` and reused by later queries.
+        """
+        if calendar is None:
+            self.holidays = WorkingDayCroniter._intern_holidays(holidays)
+        elif holidays is None or WorkingDayCroniter._intern_holidays(holidays) is calendar.holidays:
+            self.holidays = calendar.holidays
+        else:
+            raise ValueError("Holidays do not match the working day calendar.")
+        self.calendar = calendar
+
+        self.nodes = []
+        self._plans = []
+        self._slots = []
+        positions = {}
+        for expr in schedules:
+            node = CronNode.compile(expr)
+            if id(node) not in positions:
+                self._check_operators(node)
+                positions[id(node)] = len(self.nodes)
+                self.nodes.append(node)
+                self._plans.append(self._plan(node))
+            self._slots.append(positions[id(node)])
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @staticmethod
+    def _check_operators(node: CronNode):
+        if node.operator is None:
+            return
+        if node.operator not in ("AND", "OR"):
+            raise ValueError(f"Unsupported operator: {node.operator}")
+        for child in node.children:
+            ScheduleSet._check_operators(child)
+
+    def get_next(self, reference: Union[datetime, List[datetime]]) -> Union[List[Optional[datetime]], List[List[Optional[datetime]]]]:
+        """
+        Finds the first fire time strictly after the reference for every schedule.
+
+        :param reference: One datetime, or a list of them.
+        :return: One fire time per schedule (None if it never fires), or one such list per reference.
+        """
+        return self._query(reference, forward=True)
+
+    def get_prev(self, reference: Union[datetime, List[datetime]]) -> Union[List[Optional[datetime]], List[List[Optional[datetime]]]]:
+        """
+        Finds the last fire time strictly before the reference for every schedule.
+
+        :param reference: One datetime, or a list of them.
+        :return: One fire time per schedule (None if it never fires), or one such list per reference.
+        """
+        return self._query(reference, forward=False)
+
+    def _plan(self, node: CronNode) -> Optional[List[Tuple[frozenset, Tuple[int, ...]]]]:
+        """
+        Reduces a tree to ``(day keys, minutes of day)`` alternatives whose union is the schedule.
+
+        :return: The alternatives, or None if the tree must be iterated instead.
+        """
+        if node.operator is None:
+            leaf = self._leaf_plan(node)
+            return None if leaf is None else [leaf]
+
+        plans = [self._plan(child) for child in node.children]
+        if any(plan is None for plan in plans):
+            return None
+        if node.operator == "OR":
+            alternatives = [alternative for plan in plans for alternative in plan]
+        elif node.operator == "AND":
+            # Intersection distributes over the union of each child's alternatives
+            alternatives = [(frozenset(), None)]
+            for plan in plans:
+                alternatives = [
+                    (days | child_days, child_times if times is None else tuple(sorted(set(times) & set(child_times))))
+                    for days, times in alternatives
+                    for child_days, child_times in plan
+                ]
+                alternatives = [(days, times) for days, times in alternatives if times]
+                if len(alternatives) > self.max_alternatives:
+                    return None
+        else:
+            return None
+        return alternatives or None
+
+    @staticmethod
+    def _leaf_plan(node: CronNode) -> Optional[Tuple[frozenset, Tuple[int, ...]]]:
+        expanded, nth_weekday_of_month = croniter.expand(node.base_expr or node.expr)
+        if nth_weekday_of_month:
+            return None
+        if any(value != "*" and not isinstance(value, int) for field in expanded for value in field):
+            return None
+
+        minutes, hours, days, months, weekdays = (tuple(field) for field in expanded)
+        times = tuple(sorted(
+            hour * 60 + minute
+            for hour in (range(24) if hours == ("*",) else hours)
+            for minute in (range(60) if minutes == ("*",) else minutes)
+        ))
+        day_key = (months, days, weekdays, node.working_days, node.normal_days, node.has_working_day)
+        return frozenset([day_key]), times
+
+    def _calendar_for(self, first_year: int, last_year: int) -> WorkingDayCalendar:
+        """Returns ``self.calendar``, first replacing it with a wider one built from the same holidays if needed."""
+        calendar = self.calendar
+        if calendar is None:
+            self.calendar = WorkingDayCalendar.build(self.holidays, first_year, last_year)
+        elif not (calendar.covers(first_year, 1) and calendar.covers(last_year, 12)):
+            months = len(calendar.table) // 32
+            first_year = min(first_year, calendar.first_month // 12)
+            last_year = max(last_year, (calendar.first_month + months - 1) // 12)
+            self.calendar = WorkingDayCalendar.build(self.holidays, first_year, last_year)
+        return self.calendar
+
+    @staticmethod
+    def _value_masks(first_day: datetime, n_days: int, calendar: WorkingDayCalendar) -> Dict[Tuple[str, Any], int]:
+        """Builds one bitset over the window per month, day of month, weekday, working-day ordinal and last working day."""
+        bits = {}
+        for i in range(n_days):
+            day = first_day + timedelta(days=i)
+            keys = [("month", day.month), ("day", day.day), ("weekday", (day.weekday() + 1) % 7)]
+            nth = calendar.nth_working_day(day)
+            if nth:
+                keys.append(("nth", nth))
+                if nth == calendar.working_day_count(day.year, day.month):
+                    keys.append(("nth", "LW"))
+            for key in keys:
+                bits.setdefault(key, []).append(i)
+        return {key: sum(1 << i for i in positions) for key, positions in bits.items()}
+
+    @staticmethod
+    def _day_mask(day_key: Tuple, masks: Dict[Tuple[str, Any], int], full: int) -> int:
+        months, days, weekdays, working_days, normal_days, has_working_day = day_key
+
+        def union(kind, values):
+            if values == ("*",):
+                return full
+            mask = 0
+            for value in values:
+                mask |= masks.get((kind, value), 0)
+            return mask
+
+        if has_working_day:
+            day_mask = union("nth", working_days) | union("day", normal_days)
+            return union("month", months) & union("weekday", weekdays) & day_mask
+        if days == ("*",):
+            day_mask = union("weekday", weekdays)
+        elif weekdays == ("*",):
+            day_mask = union("day", days)
+        else:
+            day_mask = union("day", days) | union("weekday", weekdays)
+        return union("month", months) & day_mask
+
+    def _query(self, reference, forward: bool):
+        single = isinstance(reference, datetime)
+        references = [reference] if single else list(reference)
+        if not references:
+            return []
+
+        horizon = timedelta(days=self.horizon_days)
+        first_day = min(references).replace(hour=0, minute=0, second=0, microsecond=0) - horizon
+        last_day = max(references).replace(hour=0, minute=0, second=0, microsecond=0) + horizon
+        calendar = self._calendar_for(first_day.year, last_day.year)
+        n_days = (last_day - first_day).days + 1
+        full = (1 << n_days) - 1
+        masks = self._value_masks(first_day, n_days, calendar)
+
+        day_masks = {}
+        for plan in self._plans:
+            for days, _ in plan or ():
+                if days not in day_masks:
+                    mask = full
+                    for day_key in days:
+                        mask &= self._day_mask(day_key, masks, full)
+                    day_masks[days] = mask
+
+        results = []
+        for ref in references:
+            index = (ref.replace(hour=0, minute=0, second=0, microsecond=0) - first_day).days
+            minute = ref.hour * 60 + ref.minute
+            aligned = ref.second == 0 and ref.microsecond == 0
+            answers = []
+            for node, plan in zip(self.nodes, self._plans):
+                answer = None
+                for days, times in plan or ():
+                    found = self._scan(day_masks[days], times, index, minute, aligned, forward)
+                    if found is not None and (answer is None or (found < answer if forward else found > answer)):
+                        answer = found
+                if answer is not None:
+                    answers.append(first_day + timedelta(days=answer[0], minutes=answer[1]))
+                else:
+                    cron = WorkingDayCroniter(node, ref, self.holidays, calendar)
+                    try:
+                        answers.append(cron.get_next(datetime) if forward else cron.get_prev(datetime))
+                    except (CroniterBadDateError, RuntimeError):
+                        # A schedule that can never fire must not fail the whole batch
+                        answers.append(None)
+            results.append([answers[slot] for slot in self._slots])
+        return results[0] if single else results
+
+    @staticmethod
+    def _scan(mask: int, times: Tuple[int, ...], index: int, minute: int, aligned: bool, forward: bool) -> Optional[Tuple[int, int]]:
+        """
+        Finds the nearest ``(day index, minute of day)`` fire slot strictly after (or before) the reference.
+        """
+        if forward:
+            if mask >> index & 1:
+                position = bisect.bisect_right(times, minute)
+                if position < len(times):
+                    return index, times[position]
+            later = mask >> (index + 1)
+            if not later:
+                return None
+            return index + (later & -later).bit_length(), times[0]
+
+        if mask >> index & 1:
+            position = bisect.bisect_left(times, minute) if aligned else bisect.bisect_right(times, minute)
+            if position > 0:
+                return index, times[position - 1]
+        earlier = mask & ((1 << index) - 1)
+        if not earlier:
+            return None
+        return earlier.bit_length() - 1, times[-1]
+
+
 class MonthlyExecutionAnalyzer:
     def __init__(self, historical_data: List[datetime], threshold: float = 0.8, deviation: int = 3):
         """
@@ -368,7 +1230,10 @@ class MonthlyExecutionAnalyzer:
 
 
 class DailyExecutionAnalyzer:
-    def __init__(self, historical_data: List[datetime], holidays: List[datetime] = None, monthly_pattern: str = "*"):
+    def __init__(self, historical_data: List[datetime], holidays: List[datetime] = None, monthly_pattern: str = "*", calendar: Optional[WorkingDayCalendar] = None):
+        if holidays is None and calendar is not None:
+            holidays = calendar.holidays
+
         self.historical_data = sorted(set(dt.replace(hour=0, minute=0, second=0, microsecond=0) for dt in deepcopy(historical_data)))
 
         if monthly_pattern != "*":
@@ -376,6 +1241,9 @@ class DailyExecutionAnalyzer:
 
         self.monthly_pattern = monthly_pattern
         self.holidays = set(dt.replace(hour=0, minute=0, second=0, microsecond=0) for dt in holidays) if holidays else set()
+        if calendar is not None and calendar.holidays != self.holidays:
+            raise ValueError("Holidays do not match the working day calendar.")
+        self.calendar = calendar
 
     def detect_pattern(self) -> Dict[str, any]:
         weekday_count = self._count_by_weekday_and_filter_noise()
@@ -452,7 +1320,8 @@ class DailyExecutionAnalyzer:
     def _evaluate_cron_expr_accuracy(self, cron_expr: str, holiday: bool) -> float:
         try:
             cron = WorkingDayCroniter(
-                cron_expr, base=self.historical_data[0] - timedelta(hours=1), holidays=self.holidays if holiday else None
+                cron_expr, base=self.historical_data[0] - timedelta(hours=1), holidays=self.holidays if holiday else None,
+                calendar=self.calendar if holiday else None
             )
             
             predicted_dates = set()
@@ -466,6 +1335,9 @@ class DailyExecutionAnalyzer:
 
     @lru_cache(None)
     def _get_working_days(self, year: int, month: int) -> List[datetime]:
+        if self.calendar is not None and self.calendar.covers(year, month):
+            return self.calendar.working_days(year, month)
+
         working_days = []
         _, last_day = calendar.monthrange(year, month)
         for day in range(1, last_day + 1):
@@ -484,17 +1356,17 @@ class HourlyExecutionAnalyzer:
     def detect_pattern(self) -> Dict[str, any]:
         hours_count = self._count_by_hour_and_filter_noise()
 
-        total_hours_count_sum = sum(hours_count)
+        total_hours_count_sum = sum(hours_count.values())
         hour_with_max_count = max(hours_count, key=hours_count.get)
 
         cumulative_sum = hours_count[hour_with_max_count]
 
         counter = 0
 
-        while cumulative_sum < total_hours_count_sum * 0.9:
+        while cumulative_sum < total_hours_count_sum * 0.9 and counter < 23:
             counter += 1
-            lower_range = str(int(hour_with_max_count) - counter).zfill(2)
-            upper_range = str(int(hour_with_max_count) + counter).zfill(2)
+            lower_range = hour_with_max_count - counter
+            upper_range = hour_with_max_count + counter
 
             cumulative_sum += hours_count.get(lower_range, 0) + hours_count.get(upper_range, 0)
 
@@ -511,15 +1383,16 @@ class HourlyExecutionAnalyzer:
         return {hour: count for hour, count in hour_count.items() if count * 1.5 >= max_count}
     
 class ExecutionAnalyzer:
-    def __init__(self, historical_data: datetime, holidays: List[datetime] = None):
+    def __init__(self, historical_data: datetime, holidays: List[datetime] = None, calendar: Optional[WorkingDayCalendar] = None):
         self.historical_data = historical_data
         self.holidays = holidays
+        self.calendar = calendar
 
     def detect_pattern(self):
         mea = MonthlyExecutionAnalyzer(self.historical_data)
         monthly_pattern = mea.detect_pattern()
 
-        dea = DailyExecutionAnalyzer(self.historical_data, self.holidays, monthly_pattern['pattern'])
+        dea = DailyExecutionAnalyzer(self.historical_data, self.holidays, monthly_pattern['pattern'], self.calendar)
         daily_pattern = dea.detect_pattern()
 
         hea = HourlyExecutionAnalyzer(self.historical_data)
@@ -538,4 +1411,238 @@ class ExecutionAnalyzer:
             "hour_tolerance": tolerance,
             "includes_holidays": includes_holidays 
         }
-        
\ No newline at end of file
+        
+
+@lru_cache(maxsize=8)
+def _cli_calendar(holidays: frozenset, first_year: int, last_year: int) -> WorkingDayCalendar:
+    return WorkingDayCalendar.build(holidays, first_year, last_year)
+
+
+def _cli_schedule(value: Any) -> Union[str, List, Tuple]:
+    """Turns a JSON schedule into an expression: lists are AND, lists led by "AND"/"OR" name their operator."""
+    if isinstance(value, list):
+        children = [_cli_schedule(item) for item in value]
+        if children and isinstance(value[0], str) and value[0].upper() in ("AND", "OR"):
+            return (value[0], *children[1:])
+        return children
+    return value
+
+
+def _cli_read_records(file, input_format: str):
+    """
+    Yields ``(line number, record, error)`` for each JSONL line or CSV row, reading the input as a stream.
+
+    Lines that cannot be parsed yield a None record and the parse error.
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"line {line_number}: invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, f"line {line_number}: expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def _cli_field(record: Dict[str, Any], field: str, line_number: int) -> Any:
+    value = record.get(field)
+    if value is None:
+        raise ValueError(f"line {line_number}: missing field {field!r}")
+    return value
+
+
+def _cli_group_by_job(records, job_field: str, time_field: str):
+    """
+    Yields ``(job, history, error)`` for each run of consecutive records of the same job.
+
+    A bad timestamp marks its job as failed; a record without a job is reported on its own
+    with a None job, after the job being read when it appeared. Only the current job is
+    kept in memory, so the input must be grouped by job.
+    """
+    seen = set()
+    current, history, error = None, [], None
+    unassigned = []
+    for line_number, record, record_error in records:
+        try:
+            if record_error is not None:
+                raise ValueError(record_error)
+            job = _cli_field(record, job_field, line_number)
+        except ValueError as e:
+            unassigned.append((None, None, str(e)))
+            continue
+
+        if job != current:
+            if history or error:
+                yield current, history, error
+            yield from unassigned
+            unassigned.clear()
+            if job in seen:
+                raise ValueError(f"Input is not grouped by job: {job!r} appears again after other jobs.")
+            seen.add(job)
+            current, history, error = job, [], None
+        if error is not None:
+            continue
+        try:
+            history.append(datetime.fromisoformat(_cli_field(record, time_field, line_number)))
+        except (TypeError, ValueError) as e:
+            history, error = [], f"line {line_number}: invalid timestamp: {e}"
+    if history or error:
+        yield current, history, error
+    yield from unassigned
+
+
+def _cli_expand_tasks(records, job_field: str, schedule_field: str, start: datetime, end: datetime, holidays: frozenset):
+    """Yields one ``_cli_expand`` task per record; records that cannot be read carry their error."""
+    for line_number, record, error in records:
+        job = schedule = None
+        if error is None:
+            try:
+                job = _cli_field(record, job_field, line_number)
+                schedule = _cli_field(record, schedule_field, line_number)
+            except ValueError as e:
+                error = str(e)
+        yield job, schedule, start, end, holidays, error
+
+
+def _cli_detect(job: str, history: List[datetime], holidays: List[datetime], error: Optional[str] = None) -> List[Dict[str, Any]]:
+    if error is not None:
+        return [{"job": job, "error": error}]
+    try:
+        # The analyzers print diagnostics that would corrupt the JSONL output
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = ExecutionAnalyzer(history, holidays or None).detect_pattern()
+    except Exception as e:
+        return [{"job": job, "error": str(e)}]
+    return [{"job": job, **result}]
+
+
+def _cli_expand(job: str, schedule: Any, start: datetime, end: datetime, holidays: frozenset, error: Optional[str] = None) -> List[Dict[str, Any]]:
+    if error is not None:
+        return [{"job": job, "error": error}]
+    try:
+        working_days = _cli_calendar(holidays, start.year, end.year)
+        cron = WorkingDayCroniter(_cli_schedule(schedule), start - timedelta(seconds=1), holidays, working_days)
+        occurrences = []
+        next_date = cron.get_next(datetime)
+        while next_date < end:
+            occurrences.append({"job": job, "time": next_date.isoformat()})
+            next_date = cron.get_next(datetime)
+    except Exception as e:
+        return [{"job": job, "error": str(e)}]
+    return occurrences
+
+
+def _cli_run(function, tasks, workers: int):
+    """
+    Applies ``function`` to each task tuple, yielding results in input order.
+
+    At most ``2 * workers`` tasks are in flight, so memory stays bounded by the largest task.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point (``python -m predictor``).
+
+    ``detect`` reads execution histories grouped by job and writes the detected pattern of
+    each job; ``expand`` reads one schedule per job and writes its occurrences in a date
+    range. Both stream their input and write one JSON object per line as results arrive.
+    """
+    parser = argparse.ArgumentParser(prog="python -m predictor", description=main.__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(subparser):
+        subparser.add_argument("input", help="JSONL or CSV file, or - for stdin")
+        subparser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+        subparser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the file extension)")
+        subparser.add_argument("--holidays", help="file with one ISO date per line")
+        subparser.add_argument("--job-field", default="job")
+        subparser.add_argument("-j", "--workers", type=int, default=1, help="worker processes (default: 1)")
+
+    detect = subparsers.add_parser("detect", help="detect the schedule pattern of each job's execution history")
+    add_common(detect)
+    detect.add_argument("--time-field", default="timestamp")
+
+    expand = subparsers.add_parser("expand", help="expand each job's schedule into occurrences in [start, end)")
+    add_common(expand)
+    expand.add_argument("--schedule-field", default="schedule")
+    expand.add_argument("--start", required=True, type=datetime.fromisoformat)
+    expand.add_argument("--end", required=True, type=datetime.fromisoformat)
+
+    args = parser.parse_args(argv)
+
+    holidays = []
+    if args.holidays:
+        try:
+            with open(args.holidays, encoding="utf-8") as file:
+                holidays = [datetime.fromisoformat(line.strip()) for line in file if line.strip()]
+        except OSError as e:
+            parser.error(f"cannot read holidays {args.holidays!r}: {e.strerror}")
+        except ValueError as e:
+            parser.error(f"invalid holiday in {args.holidays!r}: {e}")
+
+    input_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    if args.input == "-":
+        input_file = sys.stdin
+    else:
+        try:
+            input_file = open(args.input, newline="" if input_format == "csv" else None, encoding="utf-8")
+        except OSError as e:
+            parser.error(f"cannot read input {args.input!r}: {e.strerror}")
+
+    try:
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    except OSError as e:
+        parser.error(f"cannot write output {args.output!r}: {e.strerror}")
+
+    records = _cli_read_records(input_file, input_format)
+    if args.command == "detect":
+        tasks = (
+            (job, history, holidays, error)
+            for job, history, error in _cli_group_by_job(records, args.job_field, args.time_field)
+        )
+        results = _cli_run(_cli_detect, tasks, args.workers)
+    else:
+        holiday_set = WorkingDayCroniter._intern_holidays(holidays)
+        tasks = _cli_expand_tasks(records, args.job_field, args.schedule_field, args.start, args.end, holiday_set)
+        results = _cli_run(_cli_expand, tasks, args.workers)
+
+    try:
+        for lines in results:
+            for line in lines:
+                output.write(json.dumps(line, default=str) + "\n")
+    except ValueError as e:
+        parser.exit(1, f"{parser.prog}: error: {e}\n")
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
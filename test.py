@@ -1,6 +1,13 @@
 import unittest
 from datetime import datetime, timedelta
-from predictor import WorkingDayCroniter, DailyExecutionAnalyzer
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from predictor import CronNode, ScheduleSet, ScheduleSnapshot, WorkingDayCalendar, WorkingDayCroniter, DailyExecutionAnalyzer, main
 
 class TestWorkingDayCroniter(unittest.TestCase):
     def setUp(self):
@@ -92,6 +99,315 @@ class TestWorkingDayCroniter(unittest.TestCase):
                         break
                 self.assertEqual(res, first_working_day, f"Failed for {res}")
 
+    def test_holidays_match_whole_day(self):
+        cron = WorkingDayCroniter("0 9 1W * *", self.base_date, holidays=self.holidays)
+        self.assertEqual(cron.get_next(datetime), datetime(2024, 1, 2, 9))
+
+    def test_and_expression(self):
+        cron = WorkingDayCroniter(["0 9 5 * *", "0 9 * * 1"], self.base_date, holidays=self.holidays)
+        results = [cron.get_next(datetime) for _ in range(3)]
+        self.assertTrue(all(res.day == 5 and res.weekday() == 0 and res.hour == 9 for res in results))
+
+
+class TestCronNode(unittest.TestCase):
+    def test_identical_expressions_share_nodes(self):
+        first = CronNode.compile(("OR", "0 8 * * 1-5", ["0 9 1W * *", "0 9 * * 1"]))
+        second = CronNode.compile(("or", "0  8 * * 1-5", ["0 9 1W * *", "0 9 * * 1"]))
+        self.assertIs(first, second)
+        self.assertIs(first.children[0], CronNode.compile("0 8 * * 1-5"))
+
+    def test_iterators_share_tree_but_not_position(self):
+        holidays = [datetime(2024, 1, 1)]
+        first = WorkingDayCroniter("0 0 1W * *", datetime(2024, 1, 1), holidays=holidays)
+        second = WorkingDayCroniter("0 0 1W * *", datetime(2024, 1, 1), holidays=list(holidays))
+        self.assertIs(first.node, second.node)
+        self.assertIs(first.holidays, second.holidays)
+        self.assertEqual(first.get_next(datetime), datetime(2024, 1, 2))
+        self.assertEqual(first.get_next(datetime), datetime(2024, 2, 1))
+        self.assertEqual(second.get_next(datetime), datetime(2024, 1, 2))
+
+    def test_pickle_keeps_interning(self):
+        node = CronNode.compile(["0 9 15W * *", "0 9 * * 3"])
+        self.assertIs(pickle.loads(pickle.dumps(node)), node)
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            CronNode.compile("0 0 xW * *")
+
+
+class TestScheduleSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.schedules = ["0 8 * * 1-5", ["0 9 15W * *", "0 9 * * 3"], ("OR", "0 0 LW * *", "0 8 * * 1-5")]
+        self.holidays = [datetime(2024, 1, 1), datetime(2024, 12, 25)]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "schedules.bin")
+
+    def test_round_trip(self):
+        ScheduleSnapshot.dump(self.path, self.schedules, self.holidays)
+        with ScheduleSnapshot.load(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 3)
+            for i, expr in enumerate(self.schedules):
+                self.assertIs(snapshot.schedule(i), CronNode.compile(expr))
+            self.assertEqual(snapshot.holidays, frozenset(self.holidays))
+            self.assertIsNone(snapshot.table_range)
+            self.assertIsNone(snapshot.next_occurrence(0, datetime(2024, 1, 1)))
+
+    def test_occurrence_tables(self):
+        start, end = datetime(2024, 1, 1), datetime(2025, 1, 1)
+        ScheduleSnapshot.dump(self.path, self.schedules, self.holidays, occurrence_range=(start, end), calendar_years=(2024, 2024))
+        with ScheduleSnapshot.load(self.path) as snapshot:
+            for i in range(len(snapshot)):
+                iterator = snapshot.iterator(i, start - timedelta(seconds=1))
+                self.assertEqual(snapshot.occurrences(i), [iterator.get_next(datetime) for _ in snapshot.occurrences(i)])
+                cron = WorkingDayCroniter(self.schedules[i], start - timedelta(seconds=1), self.holidays)
+                expected = []
+                next_date = cron.get_next(datetime)
+                while next_date < end:
+                    expected.append(next_date)
+                    next_date = cron.get_next(datetime)
+                self.assertEqual(snapshot.occurrences(i), expected)
+                self.assertEqual(snapshot.next_occurrence(i, expected[0]), expected[1])
+            self.assertIsNone(snapshot.next_occurrence(1, datetime(2023, 12, 1)))
+            self.assertIsNone(snapshot.next_occurrence(1, datetime(2024, 12, 31)))
+
+    def test_unsatisfiable_schedule_gets_empty_table(self):
+        start, end = datetime(2024, 1, 1), datetime(2025, 1, 1)
+        snapshot = ScheduleSnapshot(ScheduleSnapshot.to_bytes(["0 0 1 * *", "0 0 31 2 *"], occurrence_range=(start, end)))
+        self.assertEqual(len(snapshot.occurrences(0)), 12)
+        self.assertEqual(snapshot.occurrences(1), [])
+        self.assertIsNone(snapshot.next_occurrence(1, start))
+
+    def test_decode_skips_validation(self):
+        data = ScheduleSnapshot.to_bytes([f"{minute} 9 3W * *" for minute in range(7, 11)])
+        snapshot = ScheduleSnapshot(data)
+        with mock.patch.object(CronNode, "_raise_if_invalid_expr", side_effect=AssertionError("validated again")):
+            self.assertEqual(snapshot.schedule(3).expr, "10 9 3W * *")
+            self.assertEqual(snapshot.schedule(3).working_days, (3,))
+
+    def test_rejects_foreign_data(self):
+        with self.assertRaises(ValueError):
+            ScheduleSnapshot(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            ScheduleSnapshot(b"WDCS")
+
+    def test_rejects_truncated_data(self):
+        ScheduleSnapshot.dump(self.path, self.schedules, self.holidays, calendar_years=(2024, 2024))
+        with open(self.path, "rb") as file:
+            data = file.read()
+        with open(self.path, "wb") as file:
+            file.write(data[:-5])
+        with self.assertRaisesRegex(ValueError, "Truncated"):
+            ScheduleSnapshot.load(self.path)
+
+
+class TestWorkingDayCalendar(unittest.TestCase):
+    def setUp(self):
+        self.holidays = [datetime(2024, 1, 1), datetime(2024, 7, 4), datetime(2024, 12, 25), datetime(2025, 1, 1)]
+        self.calendar = WorkingDayCalendar.build(self.holidays, 2024, 2024)
+
+    def test_table(self):
+        self.assertEqual(self.calendar.nth_working_day(datetime(2024, 1, 1)), 0)
+        self.assertEqual(self.calendar.nth_working_day(datetime(2024, 1, 2)), 1)
+        self.assertEqual(self.calendar.working_day_count(2024, 7), 22)
+        self.assertEqual(self.calendar.working_days(2024, 2)[0], datetime(2024, 2, 1))
+        self.assertIsNone(self.calendar.nth_working_day(datetime(2025, 1, 2)))
+
+    def test_croniter_matches_uncached(self):
+        expr = "0 9 1W,5W,LW * *"
+        cached = WorkingDayCroniter(expr, datetime(2024, 1, 1), calendar=self.calendar)
+        uncached = WorkingDayCroniter(expr, datetime(2024, 1, 1), holidays=self.holidays)
+        # Runs past the end of the table to exercise the fallback as well
+        for _ in range(40):
+            self.assertEqual(cached.get_next(datetime), uncached.get_next(datetime))
+        cached = WorkingDayCroniter(expr, datetime(2024, 12, 31, 12), calendar=self.calendar)
+        self.assertEqual(cached.get_next(datetime), datetime(2025, 1, 2, 9))
+
+    def test_rejects_other_holidays(self):
+        with self.assertRaises(ValueError):
+            WorkingDayCroniter("0 0 1W * *", datetime(2024, 1, 1), [datetime(2024, 5, 1)], self.calendar)
+
+    def test_analyzer_rejects_other_holidays(self):
+        history = [datetime(2024, month, 2) for month in range(1, 7)]
+        with self.assertRaises(ValueError):
+            DailyExecutionAnalyzer(history, [datetime(2024, 5, 1)], calendar=self.calendar)
+        analyzer = DailyExecutionAnalyzer(history, list(self.holidays), calendar=self.calendar)
+        self.assertIs(analyzer.calendar, self.calendar)
+
+    def test_shared_snapshot(self):
+        published = ScheduleSnapshot.publish(None, ["0 0 3W * *"], self.holidays, calendar_years=(2024, 2025))
+        try:
+            with ScheduleSnapshot.attach(published.name) as attached:
+                self.assertEqual(attached.calendar.working_day_count(2024, 7), 22)
+                self.assertEqual(attached.iterator(0, datetime(2024, 1, 1)).get_next(datetime), datetime(2024, 1, 4))
+        finally:
+            published.close()
+            published.unlink()
+
+    def test_attach_from_other_process(self):
+        published = ScheduleSnapshot.publish(None, ["0 0 3W * *"], self.holidays, calendar_years=(2024, 2025))
+        try:
+            script = (
+                "import sys\n"
+                "from predictor import ScheduleSnapshot\n"
+                "with ScheduleSnapshot.attach(sys.argv[1]) as snapshot:\n"
+                "    print(snapshot.calendar.working_day_count(2024, 7))\n"
+            )
+            for _ in range(2):
+                worker = subprocess.run(
+                    [sys.executable, "-c", script, published.name], capture_output=True, text=True,
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                )
+                self.assertEqual(worker.returncode, 0, worker.stderr)
+                self.assertEqual(worker.stdout.strip(), "22")
+                self.assertNotIn("leaked", worker.stderr)
+            # The block must outlive the workers that attached to it
+            with ScheduleSnapshot.attach(published.name) as attached:
+                self.assertEqual(len(attached), 1)
+        finally:
+            published.close()
+            published.unlink()
+
+
+class TestScheduleSet(unittest.TestCase):
+    def setUp(self):
+        self.calendar = WorkingDayCalendar.build([datetime(2024, 1, 1), datetime(2024, 12, 25)], 2019, 2029)
+        self.schedules = [
+            "0 8 * * 1-5", "*/15 9-17 * * *", "0 0 1,15 * 7", "0 0 1W * *", "30 8 LW * *", "0 9 3W,15 * 1-5",
+            ["0 9 15W * *", "0 9 * * 3"], ("OR", "0 0 LW * *", "0 8 * * 1-5"), "0 9 29 2 *",
+            "0 0 L * *", "0 0 * * 5#2",  # Not expressible as masks, answered by iteration
+        ]
+        self.references = [
+            datetime(2024, 1, 1), datetime(2024, 1, 31, 8, 30), datetime(2024, 3, 1, 9, 0, 30), datetime(2024, 12, 24, 23, 59),
+        ]
+
+    def test_matches_croniter(self):
+        schedule_set = ScheduleSet(self.schedules, calendar=self.calendar)
+        next_dates = schedule_set.get_next(self.references)
+        prev_dates = schedule_set.get_prev(self.references)
+        for ref, next_row, prev_row in zip(self.references, next_dates, prev_dates):
+            for expr, next_date, prev_date in zip(self.schedules, next_row, prev_row):
+                self.assertEqual(next_date, WorkingDayCroniter(expr, ref, calendar=self.calendar).get_next(datetime))
+                self.assertEqual(prev_date, WorkingDayCroniter(expr, ref, calendar=self.calendar).get_prev(datetime))
+
+    def test_matches_croniter_with_holidays_only(self):
+        holidays = [datetime(2024, 1, 1), datetime(2024, 12, 25), datetime(2025, 1, 1)]
+        schedules = ["0 9 1W * *", "30 8 LW * *", "15 17 2W,15 * *", ["0 9 15W * *", "0 9 * * 3"]]
+        schedule_set = ScheduleSet(schedules, holidays)
+        for ref in self.references + [datetime(2025, 1, 1, 8)]:
+            for expr, next_date, prev_date in zip(schedules, schedule_set.get_next(ref), schedule_set.get_prev(ref)):
+                self.assertEqual(next_date, WorkingDayCroniter(expr, ref, holidays).get_next(datetime))
+                self.assertEqual(prev_date, WorkingDayCroniter(expr, ref, holidays).get_prev(datetime))
+
+    def test_unsatisfiable_schedule(self):
+        schedule_set = ScheduleSet(["0 0 1 * *", "0 0 31 2 *", ["0 9 * * *", "0 10 * * *"]])
+        self.assertEqual(schedule_set.get_next(datetime(2024, 1, 1)), [datetime(2024, 2, 1), None, None])
+        self.assertEqual(schedule_set.get_prev(datetime(2024, 1, 1)), [datetime(2023, 12, 1), None, None])
+
+    def test_extends_calendar_once(self):
+        narrow = WorkingDayCalendar.build([datetime(2024, 1, 1)], 2024, 2025)
+        schedule_set = ScheduleSet(["0 9 1W * *"], calendar=narrow)
+        self.assertEqual(schedule_set.get_next(datetime(2024, 1, 1)), [datetime(2024, 1, 2, 9)])
+        extended = schedule_set.calendar
+        self.assertIsNot(extended, narrow)
+        self.assertTrue(extended.covers(2019, 1) and extended.covers(2028, 12))
+        self.assertIs(extended.holidays, narrow.holidays)
+        schedule_set.get_prev(datetime(2024, 6, 1))
+        self.assertIs(schedule_set.calendar, extended)
+        # A calendar wide enough for the query is used as is
+        schedule_set = ScheduleSet(["0 9 1W * *"], calendar=self.calendar)
+        self.assertEqual(schedule_set.get_next(datetime(2024, 6, 1)), [datetime(2024, 6, 3, 9)])
+        self.assertIs(schedule_set.calendar, self.calendar)
+
+    def test_rejects_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            ScheduleSet(["0 0 1 * *", ("XOR", "0 0 * * *", "0 1 * * *")])
+
+    def test_single_reference_and_duplicates(self):
+        schedule_set = ScheduleSet(["0 0 1W * *", "0 8 * * 1-5", "0  0 1W * *"], [datetime(2024, 1, 1)])
+        self.assertEqual(len(schedule_set.nodes), 2)
+        self.assertEqual(
+            schedule_set.get_next(datetime(2024, 1, 1)),
+            [datetime(2024, 1, 2), datetime(2024, 1, 1, 8), datetime(2024, 1, 2)],
+        )
+
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.output = os.path.join(self.directory, "out.jsonl")
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def read_output(self):
+        with open(self.output) as file:
+            return [json.loads(line) for line in file]
+
+    def test_expand(self):
+        schedules = self.write("schedules.csv", "job,schedule\nx,0 8 1W * *\ny,0 0 xW * *\n")
+        holidays = self.write("holidays.txt", "2024-01-01\n")
+        for workers in ("1", "2"):
+            main(["expand", schedules, "--start", "2024-01-01", "--end", "2024-03-01",
+                  "--holidays", holidays, "-j", workers, "-o", self.output])
+            self.assertEqual(self.read_output(), [
+                {"job": "x", "time": "2024-01-02T08:00:00"},
+                {"job": "x", "time": "2024-02-01T08:00:00"},
+                {"job": "y", "error": "Invalid working day number in expression: xW"},
+            ])
+
+        # Same occurrences as the library API with holidays only
+        cron = WorkingDayCroniter("0 8 1W * *", datetime(2024, 1, 1), [datetime(2024, 1, 1)])
+        self.assertEqual(
+            [row["time"] for row in self.read_output() if row["job"] == "x"],
+            [cron.get_next(datetime).isoformat() for _ in range(2)],
+        )
+
+    def test_detect(self):
+        lines = [
+            json.dumps({"job": job, "timestamp": datetime(2024, month, day, 9).isoformat()})
+            for job, day in (("a", 1), ("b", 15)) for month in range(1, 13)
+        ]
+        history = self.write("history.jsonl", "\n".join(lines) + "\n")
+        main(["detect", history, "-o", self.output])
+        self.assertEqual([(row["job"], row["pattern"]) for row in self.read_output()], [
+            ("a", "0 9 1 * *"), ("b", "0 9 15 * *"),
+        ])
+
+        ungrouped = self.write("ungrouped.jsonl", "\n".join(lines + lines[:1]) + "\n")
+        with self.assertRaises(SystemExit):
+            main(["detect", ungrouped, "-o", self.output])
+
+    def test_detect_reports_failed_jobs(self):
+        lines = [json.dumps({"job": "single", "timestamp": "2024-01-01T09:00"})]
+        lines += [
+            json.dumps({"job": "mixed", "timestamp": datetime(2024, month, 1, 9 if month <= 3 else 10).isoformat()})
+            for month in range(1, 6)
+        ]
+        lines += [
+            "{not json",
+            json.dumps({"job": "bad", "timestamp": "yesterday"}),
+            json.dumps({"job": "last", "timestamp": "2024-02-01T09:00"}),
+        ]
+        history = self.write("history.jsonl", "\n".join(lines) + "\n")
+        main(["detect", history, "-j", "2", "-o", self.output])
+        rows = self.read_output()
+        self.assertEqual([row["job"] for row in rows], ["single", "mixed", None, "bad", "last"])
+        self.assertEqual(rows[1]["pattern"], "0 9 1 * *")
+        self.assertEqual(rows[1]["hour_tolerance"], 1)
+        self.assertIn("line 7", rows[2]["error"])
+        self.assertIn("invalid timestamp", rows[3]["error"])
+
+    def test_missing_input(self):
+        with self.assertRaises(SystemExit) as raised:
+            main(["detect", os.path.join(self.directory, "missing.jsonl"), "-o", self.output])
+        self.assertEqual(raised.exception.code, 2)
+
 
 class TestDailyExecutionAnalyzer(unittest.TestCase):
     def test_detect_working_day_pattern(self):